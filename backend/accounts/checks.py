@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+# Cache backends whose entries only exist in the process that wrote them
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register('caches')
+def check_token_auth_cache(app_configs, **kwargs):
+    # A user saved in one worker is only evicted from that worker's cache, so
+    # other workers would keep accepting tokens of deactivated users, or
+    # tokens issued before a password change.
+    if settings.API_TOKEN_AUTH and settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+        return [
+            Error(
+                'API_TOKEN_AUTH requires a cache shared between processes.',
+                hint='Set CACHE_BACKEND/CACHE_LOCATION (see CACHES in settings.py), or disable API_TOKEN_AUTH.',
+                id='accounts.E001',
+            )
+        ]
+    return []
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.http import HttpResponse
+
+from .tokens import get_user_from_token
+
+
+class TokenAuthenticationMiddleware:
+    """
+    Authenticates board API requests that carry an "Authorization: Token <token>"
+    header (see accounts/tokens.py). Must come after AuthenticationMiddleware,
+    whose lazy session user is replaced before anything evaluates it, so neither
+    the session nor auth_user are queried.
+
+    Token requests don't use cookies, so they are exempt from CSRF checks.
+    Does nothing unless settings.API_TOKEN_AUTH is on.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+
+        if settings.API_TOKEN_AUTH and header.startswith('Token ') and request.path.startswith(settings.API_TOKEN_AUTH_PATH):
+            user = get_user_from_token(header[len('Token '):])
+
+            if user is None:
+                return HttpResponse('Invalid or expired token', status=401)
+
+            request.user = user
+            request._dont_enforce_csrf_checks = True
+
+        return self.get_response(request)
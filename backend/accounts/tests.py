@@ -1,3 +1,90 @@
-from django.test import TestCase
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 
-# Create your tests here.
+from board.caching import invalidate_board_cache
+from board.views import create_default_board
+from .checks import check_token_auth_cache
+from .tokens import create_token
+
+
+@override_settings(API_TOKEN_AUTH=True)
+class TokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='alice-password')
+        create_default_board(self.user)
+
+    def get_board(self, **headers):
+        # Measure the whole board build, not a cache hit
+        invalidate_board_cache(self.user.id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/board/', **headers)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_token_endpoint(self):
+        self.client.force_login(self.user)
+        response = self.client.post('/accounts/token/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('token', response.json())
+
+    def test_invalid_token_is_rejected(self):
+        response = self.client.get('/board/', HTTP_AUTHORIZATION='Token nope')
+        self.assertEqual(response.status_code, 401)
+
+    def test_password_change_revokes_token(self):
+        token = create_token(self.user)
+        self.user.set_password('new-password')
+        self.user.save()
+        response = self.client.get('/board/', HTTP_AUTHORIZATION='Token ' + token)
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_query_savings(self):
+        # The first fetch after login also updates the session (see board/signals.py),
+        # so every case measures the second fetch.
+
+        # Database sessions: django_session + auth_user + the board queries
+        self.client.force_login(self.user)
+        self.get_board()
+        dbSessionQueries = self.get_board()
+        self.client.logout()
+
+        # Signed cookie sessions: auth_user + the board queries
+        with self.settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies'):
+            self.client = Client()
+            self.client.force_login(self.user)
+            self.get_board()
+            cookieSessionQueries = self.get_board()
+            self.client.logout()
+
+        # Token with a warm user cache: just the board queries
+        token = create_token(self.user)
+        self.get_board(HTTP_AUTHORIZATION='Token ' + token)
+        tokenQueries = self.get_board(HTTP_AUTHORIZATION='Token ' + token)
+
+        self.assertEqual(dbSessionQueries - cookieSessionQueries, 1)
+        self.assertEqual(cookieSessionQueries - tokenQueries, 1)
+
+    @override_settings(API_TOKEN_AUTH=False)
+    def test_disabled(self):
+        token = create_token(self.user)
+        response = self.client.get('/board/', HTTP_AUTHORIZATION='Token ' + token)
+        self.assertEqual(response.status_code, 302)
+
+
+class TokenAuthenticationCheckTests(SimpleTestCase):
+    @override_settings(API_TOKEN_AUTH=True, CACHES={
+        'default': { 'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', },
+    })
+    def test_process_local_cache_is_an_error(self):
+        self.assertEqual([error.id for error in check_token_auth_cache(None)], ['accounts.E001'])
+
+    @override_settings(API_TOKEN_AUTH=True, CACHES={
+        'default': { 'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache_table', },
+    })
+    def test_shared_cache(self):
+        self.assertEqual(check_token_auth_cache(None), [])
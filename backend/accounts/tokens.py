@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+
+"""
+Signed API tokens. A token carries the user id and the user's session auth hash
+(which changes with the password), signed with SECRET_KEY, so validating it
+doesn't need any table of issued tokens. Users are resolved through the cache,
+so an authenticated API call usually makes no auth queries at all.
+"""
+
+TOKEN_SALT = 'accounts.tokens'
+
+
+def user_cache_key(user_id):
+    return 'accounts:user:%s' % user_id
+
+
+def create_token(user):
+    """
+    Creates an API token for a user.
+
+    Parameters:
+        user (auth.models.User): The user the token authenticates.
+
+    Returns:
+        The token, as a URL-safe string.
+    """
+    return signing.dumps({ 'id': user.pk, 'hash': user.get_session_auth_hash(), }, salt=TOKEN_SALT)
+
+
+def get_cached_user(user_id):
+    """
+    Returns the user with id user_id, from the cache if possible. Cache entries
+    are dropped whenever the user is saved or deleted (see accounts/signals.py),
+    which only works with a cache shared by every process (see accounts/checks.py).
+    Changes that don't send signals, like QuerySet.update(), show up once the
+    entry expires after API_TOKEN_USER_CACHE_TIMEOUT seconds.
+
+    Parameters:
+        user_id (int): The id of the user.
+
+    Returns:
+        An auth.models.User, or None if there is no such user.
+    """
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+
+    if user is None:
+        try:
+            user = get_user_model().objects.get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        cache.set(key, user, settings.API_TOKEN_USER_CACHE_TIMEOUT)
+
+    return user
+
+
+def get_user_from_token(token):
+    """
+    Validates an API token and returns the user it authenticates.
+
+    Parameters:
+        token (str): A token created by create_token.
+
+    Returns:
+        An auth.models.User if the token is valid, has not expired, and the
+        user is still active and hasn't changed their password since the token
+        was issued; None otherwise.
+    """
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=settings.API_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+    user = get_cached_user(data['id'])
+
+    if user is None or not user.is_active:
+        return None
+    if not constant_time_compare(data['hash'], user.get_session_auth_hash()):
+        return None
+
+    return user
+
+
+def drop_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
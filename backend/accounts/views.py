@@ -1,11 +1,39 @@
 from django.shortcuts import render
 
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
+from django.conf import settings
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
 from django.urls import reverse_lazy
 from django.views import generic
 
+from .tokens import create_token
+
 
 class SignUp(generic.CreateView):
     form_class = UserCreationForm
     success_url = reverse_lazy('login')
     template_name = 'signup.html'
+
+
+@login_required
+def token(request):
+    """
+    Issues an API token for the logged in user, which can then be sent in
+    an "Authorization: Token <token>" header to call the board API without
+    a session (see accounts/middleware.py).
+
+    Parameters:
+        request (HttpRequest): The client request, which must use the POST method.
+
+    Returns:
+        A JsonResponse with shape { token: [token] }.
+    """
+
+    if not settings.API_TOKEN_AUTH:
+        raise Http404('Token authentication is disabled')
+
+    if request.method == 'POST':
+        return JsonResponse({ 'token': create_token(request.user), })
+    else:
+        return HttpResponseNotAllowed(['POST'])
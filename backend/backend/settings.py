@@ -12,11 +12,33 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
+
+def env_bool(name, default):
+    """
+    Reads a boolean from the environment variable name, accepting the usual
+    spellings (true/false, 1/0, yes/no, on/off, in any case). Anything else is
+    an error rather than silently False.
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+
+    value = value.strip().lower()
+    if value in ('true', '1', 'yes', 'on'):
+        return True
+    if value in ('false', '0', 'no', 'off'):
+        return False
+    raise ImproperlyConfigured('%s must be a boolean (true/false, 1/0, yes/no, on/off), got %r' % (name, value))
+
 
 # Defines whether we're deploying to Heroku or not.
 # Note that a Heroku deploy is mutually exclusive with a localhost deploy,
 # whether it be a manual localhost deploy or a Docker localhost deploy.
-HEROKU_DEPLOY = True
+# Can be overridden with a HEROKU_DEPLOY=false environment variable, which also
+# skips importing django_heroku (handy for local performance work).
+HEROKU_DEPLOY = env_bool('HEROKU_DEPLOY', True)
 
 # Defines whether we're deploying with Docker or not.
 # If set to True, configures DATABASES to use PostgreSQL, as defined in the docker-compose.yml file.
@@ -56,6 +78,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'accounts.apps.AccountsConfig',
     'board.apps.BoardConfig',
+    'jobs.apps.JobsConfig',
 ]
 
 MIDDLEWARE = [
@@ -64,6 +87,9 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.TokenAuthenticationMiddleware',
+    'board.middleware.ReplicaStickinessMiddleware',
+    'board.middleware.ShardMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -160,8 +186,108 @@ STATICFILES_DIRS = (
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
+# Cache. The default in-memory cache is per process, which is fine for a
+# single development server, but the token user cache, the read replica
+# stickiness marks, the shared rate limits and the board cache warmed by the
+# job workers all need a cache shared by every process, e.g.:
+#   CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache CACHE_LOCATION=127.0.0.1:11211
+#   CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache CACHE_LOCATION=cache_table (run createcachetable)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds a board aggregate stays cached, see board/caching.py. Mutations through
+# the board API drop it right away; this bounds staleness after other changes
+# (e.g. through the admin).
+BOARD_CACHE_TIMEOUT = 60 * 10
+
+# Sessions live in a signed cookie by default, which saves a django_session
+# query per request. Set SESSION_ENGINE to e.g. 'django.contrib.sessions.backends.cached_db'
+# if sessions must be revocable server-side.
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.signed_cookies')
+
+# Token authentication for the board API, see accounts/tokens.py. Requests under
+# API_TOKEN_AUTH_PATH carrying an "Authorization: Token <token>" header are
+# authenticated from the cache, without touching django_session nor auth_user.
+# Users are evicted from the cache when saved, so this requires a cache shared
+# by every process (see CACHES above); enabling it with a per-process cache is
+# a system check error.
+API_TOKEN_AUTH = env_bool('API_TOKEN_AUTH', False)
+API_TOKEN_AUTH_PATH = '/board/'
+API_TOKEN_MAX_AGE = 60 * 60 * 24 * 7         # seconds
+# Bounds how long changes that skip the save signal (e.g. QuerySet.update())
+# take to reach token authentication
+API_TOKEN_USER_CACHE_TIMEOUT = 60             # seconds
+
+
+# Board API rate limiting, see board/throttling.py.
+# Use 'board.throttling.CacheBackend' to share the limits between workers (the
+# 'CACHE' option selects which of CACHES to use).
+BOARD_RATE_LIMIT = {
+    'BACKEND': 'board.throttling.LocalMemoryBackend',
+    'RATE': 5,          # tokens refilled per second
+    'CAPACITY': 20,     # maximum burst
+}
+
+
+# Background jobs, see jobs/queue.py. Run the workers with: python manage.py run_jobs
+JOBS = {
+    'PROCESSES': 2,
+    'VISIBILITY_TIMEOUT': 60 * 5,   # seconds
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 10,              # seconds, doubled on every attempt
+    'POLL_INTERVAL': 1,             # seconds
+    'DONE_RETENTION': 60 * 60 * 24, # seconds finished jobs are kept before run_jobs deletes them
+    'PRUNE_INTERVAL': 60 * 10,      # seconds
+}
+
 
 # Heroku deploy stuff, see https://github.com/heroku/django-heroku
 if HEROKU_DEPLOY:
     import django_heroku
     django_heroku.settings(locals())
+
+
+# Read replicas of the default database, see board/routers.py. READ_REPLICAS is
+# a comma separated list: for sqlite each entry is the path of a database file,
+# for other engines it's the host of a replica. This must come after the Heroku
+# stuff, since replicas copy the (final) default database settings.
+DATABASE_READ_REPLICAS = []
+
+for i, replica in enumerate(filter(None, os.getenv('READ_REPLICAS', '').split(','))):
+    alias = 'replica%d' % (i + 1)
+    DATABASES[alias] = dict(DATABASES['default'], TEST={ 'MIRROR': 'default', })
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES[alias]['NAME'] = replica
+    else:
+        DATABASES[alias]['HOST'] = replica
+    DATABASE_READ_REPLICAS.append(alias)
+
+# Board shards, see board/routers.py. BOARD_SHARDS is a comma separated list of
+# database files/hosts like READ_REPLICAS, where 'default' stands for the default
+# database. Sharding and read replicas can't be used together.
+BOARD_SHARDS = []
+
+for i, shard in enumerate(filter(None, os.getenv('BOARD_SHARDS', '').split(','))):
+    if shard == 'default':
+        BOARD_SHARDS.append('default')
+        continue
+    alias = 'shard%d' % (i + 1)
+    DATABASES[alias] = dict(DATABASES['default'])
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES[alias]['NAME'] = shard
+    else:
+        DATABASES[alias]['HOST'] = shard
+    BOARD_SHARDS.append(alias)
+
+# Requests under this path get their board queries routed to the logged in
+# user's shard (see board/middleware.py); the admin picks shards explicitly
+BOARD_API_PATH = '/board/'
+
+DATABASE_ROUTERS = ['board.routers.ShardRouter', 'board.routers.ReadReplicaRouter']
+
+# Seconds during which a user's reads go to the primary after they change something
+REPLICA_STICKINESS_WINDOW = 10
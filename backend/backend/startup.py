@@ -0,0 +1,90 @@
+"""
+Startup profiling. Set the PROFILE_STARTUP environment variable to make
+manage.py and wsgi.py (i.e. every gunicorn worker) report how long loading
+the settings module and each installed app took, e.g.:
+
+    PROFILE_STARTUP=1 gunicorn --pythonpath backend/ backend.wsgi
+
+For every app the report splits the time between importing its package,
+importing its models and running its AppConfig.ready().
+"""
+
+from django.apps import AppConfig
+from django.utils.module_loading import import_string
+
+import importlib, os, sys, time
+
+import django
+
+
+def import_app(entry):
+    """
+    Imports the module behind an INSTALLED_APPS entry, which can be either
+    a package ('board') or an AppConfig class ('board.apps.BoardConfig').
+    """
+    try:
+        importlib.import_module(entry)
+    except ImportError:
+        import_string(entry)
+
+
+def profile_setup(out=sys.stderr):
+    """
+    Calls django.setup(), timing each of its steps, and writes a report to out.
+    Later django.setup() calls (e.g. by get_wsgi_application) are no-ops.
+
+    Parameters:
+        out (file): Where to write the report.
+    """
+    timings = {}    # app label -> { step: seconds }
+    start = time.perf_counter()
+
+    settingsModule = os.environ['DJANGO_SETTINGS_MODULE']
+    importlib.import_module(settingsModule)
+    settingsTime = time.perf_counter() - start
+
+    # Importing app packages before django.setup() does is the only way to
+    # tell their import time apart from the models'
+    from django.conf import settings
+    appImportTimes = {}
+    for entry in settings.INSTALLED_APPS:
+        appStart = time.perf_counter()
+        import_app(entry)
+        appImportTimes[entry] = time.perf_counter() - appStart
+
+    originalImportModels = AppConfig.import_models
+
+    def import_models(appConfig):
+        stepStart = time.perf_counter()
+        originalImportModels(appConfig)
+        # INSTALLED_APPS lists either the app package or its AppConfig class
+        classPath = '%s.%s' % (type(appConfig).__module__, type(appConfig).__name__)
+        timings[appConfig.label] = {
+            'import': appImportTimes.get(appConfig.name, appImportTimes.get(classPath, 0)),
+            'models': time.perf_counter() - stepStart,
+        }
+
+        # django.setup() calls ready() on every app once all the models are imported
+        originalReady = appConfig.ready
+        def ready():
+            readyStart = time.perf_counter()
+            originalReady()
+            timings[appConfig.label]['ready'] = time.perf_counter() - readyStart
+        appConfig.ready = ready
+
+    AppConfig.import_models = import_models
+    try:
+        django.setup()
+    finally:
+        AppConfig.import_models = originalImportModels
+
+    total = time.perf_counter() - start
+
+    out.write('Startup profile (pid %d)\n' % os.getpid())
+    out.write('  %-30s %8.1f ms\n' % ('settings (%s)' % settingsModule, settingsTime * 1000))
+    for label, steps in sorted(timings.items(), key=lambda item: -sum(item[1].values())):
+        out.write('  %-30s %8.1f ms  (import %.1f, models %.1f, ready %.1f)\n' % (
+            label, sum(steps.values()) * 1000,
+            steps['import'] * 1000, steps['models'] * 1000, steps.get('ready', 0) * 1000,
+        ))
+    out.write('  %-30s %8.1f ms\n' % ('total', total * 1000))
@@ -13,4 +13,8 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
+if os.getenv('PROFILE_STARTUP'):
+    from backend.startup import profile_setup
+    profile_setup()
+
 application = get_wsgi_application()
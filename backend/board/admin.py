@@ -1,7 +1,159 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Board, Section, Task
+from django.contrib.auth.models import User
+from django.http import QueryDict
+from .models import Board, Section, Task, BOARD_DEFAULTS
+from .paginators import EstimatedCountPaginator
+from .routers import is_board_model
 
 
-admin.site.register(Board)
-admin.site.register(Section)
-admin.site.register(Task)
+"""
+Admins for tables with millions of rows. Changelists join the related objects
+shown by __str__ instead of loading them one by one, foreign keys are edited
+with raw id widgets instead of <select>s listing every row (autocomplete
+widgets can't tell which shard to search), and
+pagination doesn't count the whole table. Searches are exact matches on the
+board owner's username, and filters only use indexed columns.
+
+Boards may live in another database than users (see board/routers.py), so
+nothing here joins auth_user: owners are shown by id, and searches look the
+username up in the users' database first.
+"""
+
+# Query string parameter holding the shard browsed in the admin
+SHARD_PARAM = 'shard'
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """
+    Lets staff pick which shard to browse when boards are sharded (see
+    board/routers.py). There is no "All" choice: a changelist can only show
+    one database. The queryset itself is switched by LargeTableAdmin.get_queryset,
+    since change views need the shard too.
+    """
+
+    title = 'shard'
+    parameter_name = SHARD_PARAM
+
+    def lookups(self, request, model_admin):
+        return [(shard, shard) for shard in settings.BOARD_SHARDS]
+
+    def queryset(self, request, queryset):
+        return queryset
+
+    def choices(self, changelist):
+        current = get_shard(self.value())
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': lookup == current,
+                'query_string': changelist.get_query_string({ self.parameter_name: lookup, }),
+                'display': title,
+            }
+
+
+class SectionNameListFilter(admin.SimpleListFilter):
+    """
+    Filters by the default section names. Unlike a list_filter on the name
+    field, it doesn't SELECT DISTINCT the names of every section to build its
+    choices.
+    """
+
+    title = 'section name'
+    parameter_name = 'section_name'
+    # Path from the model to Section.name
+    field = 'name'
+
+    def lookups(self, request, model_admin):
+        return [(name, name) for name in BOARD_DEFAULTS['SECTION_NAMES']]
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        return queryset.filter(**{ self.field: self.value(), })
+
+
+class TaskSectionNameListFilter(SectionNameListFilter):
+    field = 'section__name'
+
+
+def get_shard(shard):
+    """
+    Returns shard if it's one of settings.BOARD_SHARDS, otherwise the first shard.
+    """
+    return shard if shard in settings.BOARD_SHARDS else settings.BOARD_SHARDS[0]
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Skips the extra COUNT(*) of the whole table shown next to filtered results
+    show_full_result_count = False
+    # Path from the model to the id of the board owner, who is searched by username
+    user_id_field = None
+    search_help_text = 'Exact username of the board owner.'
+
+    def get_request_shard(self, request):
+        """
+        Returns the shard browsed by a request: the one picked in the changelist,
+        which the admin carries over to change views in _changelist_filters.
+        """
+        shard = request.GET.get(SHARD_PARAM)
+        if shard is None:
+            shard = QueryDict(request.GET.get('_changelist_filters', '')).get(SHARD_PARAM)
+        return get_shard(shard)
+
+    def get_search_fields(self, request):
+        # Only needs to be non-empty for the search box to show up, searches
+        # are done by get_search_results
+        return (self.user_id_field,) if self.user_id_field else ()
+
+    def get_search_results(self, request, queryset, search_term):
+        username = search_term.strip()
+        if not self.user_id_field or not username:
+            return queryset, False
+
+        # Evaluated here rather than used as a subquery, since users may live in another database
+        userIds = list(User.objects.filter(username=username).values_list('id', flat=True))
+        return queryset.filter(**{ self.user_id_field + '__in': userIds, }), False
+
+    def get_list_filter(self, request):
+        listFilter = super().get_list_filter(request)
+        if settings.BOARD_SHARDS:
+            listFilter = (ShardListFilter,) + tuple(listFilter)
+        return listFilter
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if settings.BOARD_SHARDS:
+            queryset = queryset.using(self.get_request_shard(request))
+        return queryset
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        # Validate related boards/sections against the shard being edited
+        if settings.BOARD_SHARDS and is_board_model(db_field.related_model):
+            kwargs['using'] = self.get_request_shard(request)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+@admin.register(Board)
+class BoardAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'user_id')
+    raw_id_fields = ('user',)
+    user_id_field = 'user_id'
+
+
+@admin.register(Section)
+class SectionAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'board')
+    list_select_related = ('board',)
+    list_filter = (SectionNameListFilter,)
+    raw_id_fields = ('board',)
+    user_id_field = 'board__user_id'
+
+
+@admin.register(Task)
+class TaskAdmin(LargeTableAdmin):
+    list_display = ('id', 'text', 'section')
+    list_select_related = ('section',)
+    list_filter = (TaskSectionNameListFilter,)
+    raw_id_fields = ('section',)
+    user_id_field = 'section__board__user_id'
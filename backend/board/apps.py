@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class BoardConfig(AppConfig):
     name = 'board'
+
+    def ready(self):
+        # Connect signal receivers and register system checks
+        from . import signals, checks
@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.core.cache import cache
+
+import functools, logging
+
+
+"""
+Caching of board aggregates, plus the metrics that tell whether the first
+board fetch after login found the cache warm (see the warm_board_cache job in
+board/jobs.py). Jobs run in worker processes, so warming only helps if the
+default cache is shared between processes (see CACHES in settings.py and
+board/checks.py).
+"""
+
+logger = logging.getLogger(__name__)
+
+
+"""
+Cached aggregates are keyed by a per-user generation, which invalidation bumps
+instead of deleting the aggregate. A board fetch reads the generation before
+reading the board, and caches what it built under that generation, so an
+aggregate built from data that a concurrent mutation has since changed lands
+under a key nobody reads anymore (and expires), rather than overwriting the
+invalidation.
+"""
+
+def board_cache_key(user_id, generation):
+    return 'board:aggregate:%s:%s' % (user_id, generation)
+
+
+def generation_cache_key(user_id):
+    return 'board:generation:%s' % user_id
+
+
+def get_board_generation(user_id):
+    return cache.get(generation_cache_key(user_id), 0)
+
+
+def get_cached_aggregate(user_id, generation=None):
+    """
+    Returns the cached board aggregate of a user, or None if there is none.
+
+    Parameters:
+        user_id (int): The id of the user.
+        generation (int): As returned by get_board_generation. Defaults to the current one.
+    """
+    if generation is None:
+        generation = get_board_generation(user_id)
+    return cache.get(board_cache_key(user_id, generation))
+
+
+def cache_aggregate(user_id, generation, data):
+    """
+    Caches a user's board aggregate.
+
+    Parameters:
+        user_id (int): The id of the user.
+        generation (int): The generation read (with get_board_generation)
+        before reading the board the aggregate was built from.
+        data (dict): The board aggregate.
+    """
+    cache.set(board_cache_key(user_id, generation), data, settings.BOARD_CACHE_TIMEOUT)
+
+
+def invalidate_board_cache(user_id):
+    key = generation_cache_key(user_id)
+    # incr only works on existing keys
+    cache.add(key, 0, None)
+    cache.incr(key)
+
+
+def invalidates_board_cache(func):
+    """
+    Drops the user's cached board aggregate after the decorated view changes
+    their board (i.e. returns a successful response).
+    """
+
+    @functools.wraps(func)
+    def wrapper(request, *args, **kwargs):
+        response = func(request, *args, **kwargs)
+        if response.status_code < 400:
+            invalidate_board_cache(request.user.id)
+        return response
+    return wrapper
+
+
+"""
+First load metrics. Counters live in the cache, under
+board:metrics:first-load:<warm|cold>:<count|total_ms>.
+"""
+
+FIRST_LOAD_KINDS = ('warm', 'cold')
+
+# Session flag set on login and cleared by the first board fetch
+FIRST_LOAD_SESSION_KEY = 'board_first_load_pending'
+
+
+def metric_cache_key(kind, field):
+    return 'board:metrics:first-load:%s:%s' % (kind, field)
+
+
+def record_first_load(warm, seconds):
+    """
+    Records the latency of a user's first board fetch after logging in.
+
+    Parameters:
+        warm (bool): Whether the board aggregate was served from the cache.
+        seconds (float): Time spent getting the board aggregate.
+    """
+    kind = 'warm' if warm else 'cold'
+    milliseconds = round(seconds * 1000)
+
+    for field, value in [('count', 1), ('total_ms', milliseconds)]:
+        key = metric_cache_key(kind, field)
+        # incr only works on existing keys
+        cache.add(key, 0, None)
+        cache.incr(key, value)
+
+    logger.info('First board load after login: %s, %d ms', kind, milliseconds)
+
+
+def get_first_load_metrics():
+    """
+    Returns:
+        A dict with shape { warm: { count: [count], total_ms: [totalMs] }, cold: {...} }.
+    """
+    return {
+        kind: {
+            field: cache.get(metric_cache_key(kind, field), 0)
+            for field in ('count', 'total_ms')
+        }
+        for kind in FIRST_LOAD_KINDS
+    }
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from accounts.checks import PROCESS_LOCAL_CACHES
+
+
+@register('caches')
+def check_board_cache(app_configs, **kwargs):
+    # Board aggregates are warmed by job workers (board/jobs.py), and first
+    # load metrics are counted by every web worker and read by board_metrics,
+    # all of them different processes
+    if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+        return [
+            Warning(
+                'The default cache is not shared between processes, so board cache warming '
+                'has no effect and board_metrics reports no first loads.',
+                hint='Set CACHE_BACKEND/CACHE_LOCATION (see CACHES in settings.py).',
+                id='board.W001',
+            )
+        ]
+    return []
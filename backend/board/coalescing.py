@@ -0,0 +1,66 @@
+import threading
+
+
+class _Call:
+    """
+    An in-flight call whose result is shared with every caller that
+    asked for the same key while it was running.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer:
+    """
+    Collapses concurrent calls that share a key into a single call. The first
+    caller for a key (the leader) runs the function; callers that arrive while
+    it is running wait for it and get the same result (or exception). Once the
+    leader finishes, the next call for that key runs the function again, so
+    results are never reused across bursts.
+
+    Coalescing only happens between threads of the same process (e.g. a gunicorn
+    gthread worker). Results are shared, so callers must not mutate them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Calls func(*args, **kwargs), unless a call for key is already running,
+        in which case waits for it and returns its result.
+
+        Parameters:
+            key (hashable): Identifies calls that can share a result.
+            func (callable): The function to call.
+
+        Returns:
+            The value returned by func.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            isLeader = call is None
+            if isLeader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not isLeader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -0,0 +1,44 @@
+from django.contrib.auth.models import User
+
+from .models import Board
+from .caching import cache_aggregate, get_board_generation, get_cached_aggregate
+from .routers import pinned_to_primary, user_shard
+from .views import create_board_aggregate, create_default_board
+
+
+"""
+Board work deferred to the job queue, see jobs/queue.py. Jobs can run more
+than once, so they must be idempotent.
+"""
+
+def provision_default_board(user_id):
+    """
+    Creates the default board of a new user, so that their first board
+    fetch doesn't have to. Does nothing if the user already has a board.
+
+    Parameters:
+        user_id (int): The id of the user.
+    """
+    create_default_board(User.objects.get(pk=user_id))
+
+
+def warm_board_cache(user_id):
+    """
+    Builds and caches the board aggregate of a user who just logged in, so
+    that their first board fetch is served from the cache. Does nothing if
+    the aggregate is already cached, or if the user has no board yet: that's
+    left to provision_default_board and the board view, which create it
+    safely.
+
+    Parameters:
+        user_id (int): The id of the user.
+    """
+    generation = get_board_generation(user_id)
+    if get_cached_aggregate(user_id, generation) is not None:
+        return
+
+    with user_shard(user_id), pinned_to_primary():
+        board = Board.objects.filter(user_id=user_id).first()
+        if board is None:
+            return
+        cache_aggregate(user_id, generation, create_board_aggregate(board))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from board.caching import get_first_load_metrics
+
+
+class Command(BaseCommand):
+    help = 'Reports the latency of the first board fetch after login, split by warm and cold cache.'
+
+    def handle(self, *args, **options):
+        for kind, metrics in get_first_load_metrics().items():
+            count = metrics['count']
+            average = metrics['total_ms'] / count if count else 0
+            self.stdout.write('%s first loads: %d, average %.1f ms' % (kind.capitalize(), count, average))
@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, transaction
+
+from board.caching import invalidate_board_cache
+from board.models import Board, Section, Task
+from board.routers import shard_for_user
+
+
+def move_board(board, source, target):
+    """
+    Moves a board, with its sections and tasks, from one database to another.
+    The moved rows get new ids in the target database (ids are only unique
+    within a shard), so the user's cached board aggregate is invalidated and
+    clients holding the old ids must refetch the board.
+
+    If the user already has a board in target (e.g. one created by a board
+    fetch made after BOARD_SHARDS changed), the moved sections and tasks are
+    merged into it instead: tasks go to the section with the same name, which
+    is created if the board doesn't have one.
+
+    Parameters:
+        board (board.models.Board): The board to move, as read from source.
+        source (str): The alias of the database the board is in.
+        target (str): The alias of the database the board is moved to.
+
+    Returns:
+        The board holding the moved rows, as saved in target.
+    """
+    with transaction.atomic(using=target), transaction.atomic(using=source):
+        newBoard = Board.objects.using(target).filter(user_id=board.user_id).first()
+        if newBoard is None:
+            newBoard = Board(name=board.name, user_id=board.user_id)
+            newBoard.save(using=target)
+
+        newSections = { section.name: section for section in Section.objects.using(target).filter(board=newBoard) }
+
+        for section in Section.objects.using(source).filter(board=board).order_by('id'):
+            newSection = newSections.get(section.name)
+            if newSection is None:
+                newSection = Section(name=section.name, board=newBoard)
+                newSection.save(using=target)
+
+            tasks = Task.objects.using(source).filter(section=section).order_by('id')
+            Task.objects.using(target).bulk_create(Task(text=task.text, section=newSection) for task in tasks)
+
+        # Cascades to sections and tasks
+        board.delete()
+
+    invalidate_board_cache(board.user_id)
+    return newBoard
+
+
+class Command(BaseCommand):
+    help = 'Moves every board (with its sections and tasks) to the shard its user maps to in settings.BOARD_SHARDS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', action='append', default=[],
+            help='Also move boards out of this database alias (e.g. a shard being removed). Can be repeated.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report which boards would be moved.',
+        )
+
+    def handle(self, *args, **options):
+        sources = [DEFAULT_DB_ALIAS] + list(settings.BOARD_SHARDS) + options['source']
+        moved = 0
+        failed = 0
+
+        for source in dict.fromkeys(sources):
+            # Collect ids first, so moving boards doesn't disturb the iteration
+            boardIds = list(Board.objects.using(source).values_list('id', flat=True).order_by('id'))
+
+            for boardId in boardIds:
+                board = Board.objects.using(source).get(pk=boardId)
+                target = shard_for_user(board.user_id)
+
+                if target == source:
+                    continue
+
+                self.stdout.write('Moving board %d of user %d: %s -> %s' % (board.id, board.user_id, source, target))
+                if not options['dry_run']:
+                    try:
+                        move_board(board, source, target)
+                    except DatabaseError as e:
+                        # The move was rolled back; carry on with the other boards
+                        self.stderr.write('Could not move board %d: %s' % (board.id, e))
+                        failed += 1
+                        continue
+                moved += 1
+
+        self.stdout.write(self.style.SUCCESS('%d board(s) %s.' % (moved, 'to move' if options['dry_run'] else 'moved')))
+        if failed:
+            self.stderr.write('%d board(s) could not be moved, run the command again to retry them.' % failed)
@@ -0,0 +1,114 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+import collections, concurrent.futures, multiprocessing, time
+
+import django
+
+from board.models import Board, Section, Task, BOARD_DEFAULTS
+from board.routers import shard_for_user
+
+
+def seed_chunk(prefix, first, last, tasksPerSection, batchSize):
+    """
+    Creates users first..last-1 (named <prefix>-<n>), each with a default
+    board whose sections hold tasksPerSection tasks, using bulk inserts.
+    Boards are created in their user's shard (see board/routers.py).
+
+    Returns:
+        The number of users created.
+    """
+    # Hashing a password takes longer than inserting the whole user, and
+    # seeded users don't need to log in anyway
+    password = make_password(None)
+    users = [User(username='%s-%d' % (prefix, n), password=password) for n in range(first, last)]
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=batchSize)
+        if users[0].pk is None:
+            # The database can't return the ids of bulk inserted rows
+            ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+
+    usersByShard = collections.defaultdict(list)
+    for user in users:
+        usersByShard[shard_for_user(user.pk)].append(user)
+
+    for shard, shardUsers in usersByShard.items():
+        with transaction.atomic(using=shard):
+            seed_boards(shard, shardUsers, tasksPerSection, batchSize)
+
+    return len(users)
+
+
+def seed_boards(using, users, tasksPerSection, batchSize):
+    """
+    Creates a default board with tasksPerSection tasks per section for each
+    user, in database using.
+    """
+    boards = [Board(name=BOARD_DEFAULTS['NAME'], user_id=user.pk) for user in users]
+    Board.objects.using(using).bulk_create(boards, batch_size=batchSize)
+    if boards[0].pk is None:
+        boards = list(Board.objects.using(using).filter(user_id__in=[user.pk for user in users]))
+
+    sections = [
+        Section(name=sectionName, board_id=board.pk)
+        for board in boards
+        for sectionName in BOARD_DEFAULTS['SECTION_NAMES']
+    ]
+    Section.objects.using(using).bulk_create(sections, batch_size=batchSize)
+    if sections[0].pk is None:
+        sections = list(Section.objects.using(using).filter(board_id__in=[board.pk for board in boards]))
+
+    tasks = [
+        Task(text='Task %d' % n, section_id=section.pk)
+        for section in sections
+        for n in range(tasksPerSection)
+    ]
+    Task.objects.using(using).bulk_create(tasks, batch_size=batchSize)
+
+
+class Command(BaseCommand):
+    help = 'Quickly creates lots of users with default boards and tasks, for performance work.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to create.')
+        parser.add_argument('--tasks-per-section', type=int, default=5, help='Number of tasks in every section.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users per chunk of work, and rows per INSERT.')
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Number of processes inserting chunks in parallel. SQLite only allows one writer at a time, '
+                 'so this only helps with databases like PostgreSQL.',
+        )
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Usernames are <prefix>-<n>. Use a new prefix to add more users to a seeded database.',
+        )
+
+    def handle(self, *args, **options):
+        users = options['users']
+        batchSize = options['batch_size']
+        chunks = [
+            (options['prefix'], first, min(first + batchSize, users), options['tasks_per_section'], batchSize)
+            for first in range(0, users, batchSize)
+        ]
+        start = time.perf_counter()
+        created = 0
+
+        if options['processes'] > 1:
+            # Spawned rather than forked, so that workers don't share our database connections
+            context = multiprocessing.get_context('spawn')
+            with concurrent.futures.ProcessPoolExecutor(options['processes'], mp_context=context, initializer=django.setup) as pool:
+                futures = [pool.submit(seed_chunk, *chunk) for chunk in chunks]
+                for future in concurrent.futures.as_completed(futures):
+                    created += future.result()
+                    self.stdout.write('%d/%d users' % (created, users))
+        else:
+            for chunk in chunks:
+                created += seed_chunk(*chunk)
+                self.stdout.write('%d/%d users' % (created, users))
+
+        self.stdout.write(self.style.SUCCESS('Created %d users in %.1f s.' % (created, time.perf_counter() - start)))
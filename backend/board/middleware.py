@@ -0,0 +1,60 @@
+from django.conf import settings
+
+import random
+
+from .routers import pinned_to_primary, using_replica, mark_user_wrote, user_wrote_recently, user_shard
+
+
+# Methods that never mutate data
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Decides whether board reads of a request may go to a read replica (see
+    board/routers.py). Mutating requests, and requests by users who mutated
+    something in the last REPLICA_STICKINESS_WINDOW seconds, read from the
+    primary. The others read from a single replica, picked per request.
+    Must come after the authentication middlewares.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_READ_REPLICAS:
+            # Nothing to route, don't pay for the user lookup
+            return self.get_response(request)
+
+        user = request.user
+        isMutation = request.method not in SAFE_METHODS
+        pinned = isMutation or (user.is_authenticated and user_wrote_recently(user.id))
+
+        with pinned_to_primary(pinned), using_replica(random.choice(settings.DATABASE_READ_REPLICAS)):
+            response = self.get_response(request)
+
+        if isMutation and user.is_authenticated:
+            mark_user_wrote(user.id)
+
+        return response
+
+
+class ShardMiddleware:
+    """
+    Routes the board queries of board API requests (those under
+    settings.BOARD_API_PATH) to the shard of the logged in user (see
+    board/routers.py). Other pages, like the admin, aren't about the logged in
+    user's board, so they must pick a shard explicitly. Must come after the
+    authentication middlewares.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.BOARD_SHARDS or not request.path.startswith(settings.BOARD_API_PATH) \
+                or not request.user.is_authenticated:
+            return self.get_response(request)
+
+        with user_shard(request.user.id):
+            return self.get_response(request)
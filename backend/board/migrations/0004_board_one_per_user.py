@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def delete_duplicate_boards(apps, schema_editor):
+    # Before the constraint, racing board fetches could give a user more than
+    # one board; the first one is the one that was shown, so keep it
+    Board = apps.get_model('board', 'Board')
+    boards = Board.objects.using(schema_editor.connection.alias)
+    duplicated = boards.values('user_id').annotate(count=models.Count('id'), first=models.Min('id')).filter(count__gt=1)
+
+    for row in duplicated:
+        boards.filter(user_id=row['user_id']).exclude(pk=row['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('board', '0003_alter_section_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_boards, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='board',
+            constraint=models.UniqueConstraint(fields=('user',), name='board_one_per_user'),
+        ),
+    ]
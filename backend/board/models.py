@@ -21,14 +21,25 @@ BOARD_DEFAULTS = {
 
 class Board(models.Model):
     name = models.CharField(max_length=NAME_MAXLENGTH)
-    user = models.ForeignKey(User, on_delete=models.CASCADE) 
+    # Boards can live in a different database than users (see board/routers.py),
+    # so the database can't enforce this foreign key
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+
+    class Meta:
+        constraints = [
+            # Users have a single board, which is created on demand by more than
+            # one path (see create_default_board in board/views.py). All of a
+            # user's boards live in the same shard, so a per-table constraint is enough.
+            models.UniqueConstraint(fields=['user'], name='board_one_per_user'),
+        ]
 
     def __str__(self):
         return self.name
 
 
 class Section(models.Model):
-    name = models.CharField(max_length=NAME_MAXLENGTH)
+    # Indexed for the admin's filter by name
+    name = models.CharField(max_length=NAME_MAXLENGTH, db_index=True)
     board = models.ForeignKey(Board, on_delete=models.CASCADE)
 
     def __str__(self):
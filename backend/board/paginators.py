@@ -0,0 +1,42 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for huge tables. Counting every row of an unfiltered queryset
+    means scanning the whole table, so on PostgreSQL it uses the planner's row
+    estimate instead (kept up to date by autovacuum). Filtered querysets, small
+    tables and other databases still get an exact count.
+    """
+
+    # Below this many rows an exact count is cheap, and more useful
+    ESTIMATE_THRESHOLD = 100000
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate_count()
+        if estimate is not None and estimate >= self.ESTIMATE_THRESHOLD:
+            return estimate
+        return super().count
+
+    def estimate_count(self):
+        """
+        Returns:
+            The estimated number of rows of the queryset, or None if it can't
+            be estimated.
+        """
+        queryset = self.object_list
+        if not hasattr(queryset, 'query') or queryset.query.where:
+            return None
+
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+
+        return int(row[0]) if row else None
@@ -0,0 +1,200 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+import contextlib, contextvars, random
+
+from .models import Board
+
+
+"""
+Database routing for the board app.
+
+ShardRouter partitions boards by user: every Board, Section and Task of a user
+lives in the shard settings.BOARD_SHARDS[user_id % len(BOARD_SHARDS)], while
+users, sessions and everything else stay in the default database. Board queries
+are routed by the instance they come from when there is one (e.g. through
+board.section_set), and otherwise by the user of the current request (see
+board/middleware.py) or of a user_shard block. Board queries made outside of
+both go to the default database, so code that isn't about one user's board
+(e.g. the admin, see board/admin.py) must pick a shard with .using(). When
+shards change, run manage.py rebalance_shards.
+
+ReadReplicaRouter sends reads of board models to one of the replicas listed
+in settings.DATABASE_READ_REPLICAS, and all writes to the primary (default)
+database. All board reads of a request go to the same replica (chosen by
+board/middleware.py, see using_replica). Since replicas lag behind the primary, reads are pinned to the
+primary while handling a mutating request, and for REPLICA_STICKINESS_WINDOW
+seconds after a user's last mutation (read-your-writes), so the frontend never
+gets a board older than the user's own changes. See board/middleware.py.
+"""
+
+_pinned_to_primary = contextvars.ContextVar('board_pinned_to_primary', default=False)
+
+
+def is_pinned_to_primary():
+    return _pinned_to_primary.get()
+
+
+@contextlib.contextmanager
+def pinned_to_primary(pinned=True):
+    """
+    Context manager that sends board reads done inside it to the primary
+    database (or lets them go to the replicas again, if pinned is False).
+    """
+    token = _pinned_to_primary.set(pinned)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+_current_replica = contextvars.ContextVar('board_current_replica', default=None)
+
+
+@contextlib.contextmanager
+def using_replica(alias):
+    """
+    Context manager that sends every board read done inside it to the same
+    replica, so that they all see the same (possibly lagging) state instead
+    of mixing replicas with different lag.
+    """
+    token = _current_replica.set(alias)
+    try:
+        yield
+    finally:
+        _current_replica.reset(token)
+
+
+def stickiness_cache_key(user_id):
+    return 'board:wrote-recently:%s' % user_id
+
+
+def mark_user_wrote(user_id):
+    """
+    Pins the user's reads to the primary database for the next
+    REPLICA_STICKINESS_WINDOW seconds. The stickiness marks live in the
+    default cache, which must be shared between workers for this to work
+    across them.
+    """
+    cache.set(stickiness_cache_key(user_id), True, settings.REPLICA_STICKINESS_WINDOW)
+
+
+def user_wrote_recently(user_id):
+    return cache.get(stickiness_cache_key(user_id), False)
+
+
+def is_board_model(obj):
+    """
+    Checks whether obj is a board model, or an instance of one.
+    """
+    return obj._meta.app_label == 'board'
+
+
+_current_user_id = contextvars.ContextVar('board_shard_user_id', default=None)
+
+
+def shard_for_user(user_id):
+    """
+    Returns the database alias of the shard that holds a user's board. If
+    sharding is disabled, that's the default database.
+    """
+    shards = settings.BOARD_SHARDS
+    if not shards:
+        return DEFAULT_DB_ALIAS
+    return shards[user_id % len(shards)]
+
+
+@contextlib.contextmanager
+def user_shard(user_id):
+    """
+    Context manager that routes board queries done inside it, which don't come
+    from a model instance, to the shard of the user with id user_id.
+    """
+    token = _current_user_id.set(user_id)
+    try:
+        yield
+    finally:
+        _current_user_id.reset(token)
+
+
+class ShardRouter:
+    def db_for_read(self, model, **hints):
+        if not settings.BOARD_SHARDS:
+            return None
+
+        instance = hints.get('instance')
+
+        if not is_board_model(model):
+            # Users live in the default database, even when reached through a
+            # sharded board (i.e. board.user)
+            if instance is not None and is_board_model(instance):
+                return DEFAULT_DB_ALIAS
+            return None
+
+        if isinstance(instance, User):
+            # Reached through a user, e.g. Board(user=user) or user.board_set
+            return shard_for_user(instance.pk)
+        if instance is not None and is_board_model(instance):
+            if instance._state.db is not None:
+                return instance._state.db
+            if isinstance(instance, Board) and instance.user_id is not None:
+                # New board
+                return shard_for_user(instance.user_id)
+
+        user_id = _current_user_id.get()
+        if user_id is not None:
+            return shard_for_user(user_id)
+        return DEFAULT_DB_ALIAS
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Boards are related to users across databases
+        if settings.BOARD_SHARDS and (is_board_model(obj1) or is_board_model(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Shards only hold board tables
+        if db != DEFAULT_DB_ALIAS and db in settings.BOARD_SHARDS:
+            return app_label == 'board'
+        return None
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not is_board_model(model):
+            return None
+
+        replicas = settings.DATABASE_READ_REPLICAS
+        if not replicas or is_pinned_to_primary():
+            return DEFAULT_DB_ALIAS
+
+        # Follow the instance a query comes from (e.g. board.section_set), so
+        # that an aggregate is read from a single replica
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in replicas:
+            return instance._state.db
+
+        return _current_replica.get() or random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if not is_board_model(model):
+            return None
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary, so objects read from
+        # any of them can be related to each other
+        pool = [DEFAULT_DB_ALIAS] + list(settings.DATABASE_READ_REPLICAS)
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        if db in settings.DATABASE_READ_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from jobs.queue import enqueue
+from .caching import FIRST_LOAD_SESSION_KEY
+from .jobs import provision_default_board, warm_board_cache
+from .models import Board
+from .routers import shard_for_user
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def defer_default_board(sender, instance, created, raw=False, **kwargs):
+    # Provision the board in the background instead of in the first board GET
+    if created and not raw:
+        enqueue(provision_default_board, instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def delete_sharded_board(sender, instance, **kwargs):
+    # Deleting a user only cascades to boards in the user's own database, and
+    # there is no foreign key constraint to catch the ones left in a shard
+    shard = shard_for_user(instance.pk)
+    if settings.BOARD_SHARDS and shard != instance._state.db:
+        Board.objects.using(shard).filter(user_id=instance.pk).delete()
+
+
+@receiver(user_logged_in)
+def warm_board_cache_on_login(sender, request, user, **kwargs):
+    # The login redirect and the frontend boot give the worker a head start
+    # on building the board before the first board fetch
+    enqueue(warm_board_cache, user.id)
+
+    # Makes the first board fetch record whether it found the cache warm
+    request.session[FIRST_LOAD_SESSION_KEY] = True
@@ -1,3 +1,551 @@
-from django.test import TestCase
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.contrib.auth.models import User, Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, transaction, IntegrityError
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+import io, json, os, tempfile, threading, time
+
+from jobs.models import Job
+from .models import Board, Section, Task, BOARD_DEFAULTS
+from .coalescing import RequestCoalescer
+from .throttling import LocalMemoryBackend
+from .routers import pinned_to_primary, using_replica, mark_user_wrote, shard_for_user, user_shard, ReadReplicaRouter
+from .views import create_default_board, get_board_aggregate
+from .jobs import provision_default_board, warm_board_cache
+from .caching import get_board_generation, get_cached_aggregate, get_first_load_metrics, invalidate_board_cache
+from .checks import check_board_cache
+
+
+def add_sqlite_database(alias):
+    """
+    Adds a database alias backed by a temporary SQLite file, for tests that
+    need more than one database. The test runner only knows about the aliases
+    in settings.DATABASES, so test cases using it must set databases = '__all__'
+    and call it before TestCase.setUpClass, which resolves '__all__'.
+
+    Returns:
+        The path of the database file.
+    """
+    fd, path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(fd)
+    default = connections.settings['default']
+    connections.settings[alias] = dict(default, NAME=path, TEST=dict(default['TEST'], NAME=path))
+    return path
+
+
+def remove_sqlite_database(alias, path):
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+    os.remove(path)
+
+
+class BoardTestCase(TestCase):
+    """
+    Base test case with a logged in user who owns a default board.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='alice-password')
+        self.board = create_default_board(self.user)
+        self.sections = list(self.board.section_set.all())
+        self.client.force_login(self.user)
+
+    def add_task(self, section, text='Some task'):
+        return self.client.post(
+            '/board/section/%d/task' % section.id,
+            json.dumps({ 'text': text, }),
+            content_type='application/json',
+        )
+
+
+@override_settings(BOARD_RATE_LIMIT={
+    'BACKEND': 'board.throttling.LocalMemoryBackend',
+    'RATE': 0.001,
+    'CAPACITY': 2,
+})
+class RateLimitTests(BoardTestCase):
+    def test_rejects_requests_over_capacity(self):
+        self.assertEqual(self.add_task(self.sections[0]).status_code, 200)
+        self.assertEqual(self.add_task(self.sections[0]).status_code, 200)
+
+        response = self.add_task(self.sections[0])
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_buckets_are_per_endpoint(self):
+        task = Task.objects.create(text='Some task', section=self.sections[0])
+        self.add_task(self.sections[0])
+        self.add_task(self.sections[0])
+
+        response = self.client.post('/board/section/%d/task/%d/promote' % (self.sections[0].id, task.id))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(BOARD_RATE_LIMIT={
+        'BACKEND': 'board.throttling.CacheBackend',
+        'RATE': 0.001,
+        'CAPACITY': 1,
+    })
+    def test_cache_backend(self):
+        self.assertEqual(self.add_task(self.sections[0]).status_code, 200)
+        self.assertEqual(self.add_task(self.sections[0]).status_code, 429)
+
+
+class LocalMemoryBackendTests(SimpleTestCase):
+    def test_full_buckets_are_evicted(self):
+        backend = LocalMemoryBackend(rate=1, capacity=2)
+        now = time.time()
+        backend._buckets = {
+            'idle': (0, now - 5),
+            'active': (0, now),
+        }
+        backend._lastSweep = now - 5
+
+        backend.consume('new')
+
+        self.assertEqual(set(backend._buckets), {'active', 'new'})
+
+
+class RequestCoalescerTests(SimpleTestCase):
+    def test_concurrent_calls_share_result(self):
+        coalescer = RequestCoalescer()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def build():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return { 'id': 1, }
+
+        leader = threading.Thread(target=lambda: results.append(coalescer.do('alice', build)))
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=lambda: results.append(coalescer.do('alice', build))) for i in range(3)]
+        for follower in followers:
+            follower.start()
+        # Give the followers time to block on the leader's call
+        time.sleep(0.2)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 4)
+
+    def test_sequential_calls_are_not_shared(self):
+        coalescer = RequestCoalescer()
+        self.assertEqual(coalescer.do('alice', lambda: 1), 1)
+        self.assertEqual(coalescer.do('alice', lambda: 2), 2)
+
+
+@override_settings(DATABASE_READ_REPLICAS=['replica1', 'replica2'])
+class ReadReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+
+    def test_reads_follow_instance_replica(self):
+        board = Board()
+        board._state.db = 'replica2'
+        with using_replica('replica1'):
+            self.assertEqual(self.router.db_for_read(Section, instance=board), 'replica2')
+
+    def test_reads_use_request_replica(self):
+        with using_replica('replica2'):
+            for i in range(10):
+                self.assertEqual(self.router.db_for_read(Board), 'replica2')
+
+    def test_pinned_reads_ignore_instance_replica(self):
+        board = Board()
+        board._state.db = 'replica2'
+        with pinned_to_primary():
+            self.assertEqual(self.router.db_for_read(Section, instance=board), 'default')
+
+
+@override_settings(DATABASE_READ_REPLICAS=['replica'])
+class ReadReplicaTests(BoardTestCase):
+    """
+    Uses a second SQLite file as a replica that never catches up with the
+    primary, so every test can tell where its reads went.
+    """
+
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replicaPath = add_sqlite_database('replica')
+        with connections['replica'].schema_editor() as editor:
+            for model in [ContentType, Permission, Group, User, Board, Section, Task]:
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        remove_sqlite_database('replica', cls.replicaPath)
+
+    def setUp(self):
+        with pinned_to_primary():
+            super().setUp()
+        # Replicate the user and their empty board, then let the replica fall behind
+        self.user.save(using='replica')
+        self.board.save(using='replica')
+        for section in self.sections:
+            section.save(using='replica')
+        Task.objects.create(text='Not replicated yet', section=self.sections[0])
+
+    def test_reads_go_to_replica(self):
+        self.assertFalse(Task.objects.exists())
+        with pinned_to_primary():
+            self.assertTrue(Task.objects.exists())
+
+    def test_writes_go_to_primary(self):
+        self.add_task(self.sections[0])
+        self.assertEqual(Task.objects.using('default').count(), 2)
+        self.assertEqual(Task.objects.using('replica').count(), 0)
+
+    def test_board_is_read_from_replica(self):
+        data = self.client.get('/board/').json()
+        self.assertEqual(data['sections'][0]['tasks'], [])
+
+    def test_replica_reads_are_not_cached(self):
+        self.client.get('/board/')
+        self.assertIsNone(get_cached_aggregate(self.user.id))
+
+        # The replica was behind, so a later fetch pinned to the primary sees the task
+        mark_user_wrote(self.user.id)
+        data = self.client.get('/board/').json()
+        self.assertEqual(len(data['sections'][0]['tasks']), 1)
+        self.assertIsNotNone(get_cached_aggregate(self.user.id))
+
+    def test_board_is_read_from_primary_after_write(self):
+        self.add_task(self.sections[1])
+        data = self.client.get('/board/').json()
+        self.assertEqual(len(data['sections'][0]['tasks']), 1)
+        self.assertEqual(len(data['sections'][1]['tasks']), 1)
+
+    def test_stickiness_is_per_user(self):
+        mark_user_wrote(self.user.id + 1)
+        data = self.client.get('/board/').json()
+        self.assertEqual(data['sections'][0]['tasks'], [])
+
+    def test_missing_board_is_not_duplicated(self):
+        Board.objects.using('replica').all().delete()
+        self.client.get('/board/')
+        self.assertEqual(Board.objects.using('default').filter(user=self.user).count(), 1)
+
+
+@override_settings(BOARD_SHARDS=['shard1', 'shard2'])
+class ShardTests(TestCase):
+    """
+    Shards boards between two SQLite files, while users stay in the default database.
+    """
+
+    databases = '__all__'
+    shards = ['shard1', 'shard2']
+
+    @classmethod
+    def setUpClass(cls):
+        cls.shardPaths = [add_sqlite_database(shard) for shard in cls.shards]
+        with override_settings(BOARD_SHARDS=cls.shards):
+            for shard in cls.shards:
+                call_command('migrate', database=shard, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for shard, path in zip(cls.shards, cls.shardPaths):
+            remove_sqlite_database(shard, path)
+
+    def setUp(self):
+        cache.clear()
+        # Consecutive ids, so the two users map to different shards
+        self.users = [User.objects.create_user(name, password=name + '-password') for name in ['alice', 'bob']]
+
+    def count_rows(self, using):
+        return (
+            Board.objects.using(using).count(),
+            Section.objects.using(using).count(),
+            Task.objects.using(using).count(),
+        )
+
+    def test_shard_for_user(self):
+        self.assertEqual(shard_for_user(1), 'shard2')
+        self.assertEqual(shard_for_user(2), 'shard1')
+
+    def test_board_rows_live_together(self):
+        for user in self.users:
+            self.client.force_login(user)
+            data = self.client.get('/board/').json()
+            self.client.post(
+                '/board/section/%d/task' % data['sections'][0]['id'],
+                json.dumps({ 'text': 'Some task', }),
+                content_type='application/json',
+            )
+
+        for user in self.users:
+            shard = shard_for_user(user.id)
+            board = Board.objects.using(shard).get(user=user)
+            self.assertEqual(Section.objects.using(shard).filter(board=board).count(), 3)
+            self.assertEqual(Task.objects.using(shard).filter(section__board=board).count(), 1)
+        self.assertEqual(self.count_rows('default'), (0, 0, 0))
+
+    def test_user_shard(self):
+        user = self.users[0]
+        with user_shard(user.id):
+            create_default_board(user)
+            self.assertTrue(Board.objects.filter(user=user).exists())
+        self.assertEqual(Board.objects.using(shard_for_user(user.id)).count(), 1)
+
+    def test_rebalance(self):
+        # Boards created before sharding was enabled live in the default database
+        with self.settings(BOARD_SHARDS=[]):
+            # Reversed, so that the ids alice's board has in default are taken by nothing in her shard
+            for user in reversed(self.users):
+                board = create_default_board(user)
+                Task.objects.create(text='Some task', section=board.section_set.first())
+            self.client.force_login(self.users[0])
+            self.client.get('/board/')
+        self.assertEqual(self.count_rows('default'), (2, 6, 2))
+
+        call_command('rebalance_shards', stdout=io.StringIO())
+
+        self.assertEqual(self.count_rows('default'), (0, 0, 0))
+        for user in self.users:
+            shard = shard_for_user(user.id)
+            self.assertEqual(self.count_rows(shard), (1, 3, 1))
+            self.assertEqual(Task.objects.using(shard).get().section.board.user_id, user.id)
+
+        # The cached aggregate held the ids the board had in the default database
+        data = self.client.get('/board/').json()
+        self.assertEqual(data['id'], Board.objects.using(shard_for_user(self.users[0].id)).get().id)
+
+    def test_rebalance_merges_board_created_after_shard_change(self):
+        user = self.users[0]
+        with self.settings(BOARD_SHARDS=[]):
+            board = create_default_board(user)
+            Task.objects.create(text='Old task', section=board.section_set.get(name='DOING'))
+            create_default_board(self.users[1])
+
+        # The user fetched their board before the rebalance, and got a new one
+        self.client.force_login(user)
+        data = self.client.get('/board/').json()
+        self.client.post(
+            '/board/section/%d/task' % data['sections'][0]['id'],
+            json.dumps({ 'text': 'New task', }),
+            content_type='application/json',
+        )
+        self.client.get('/board/')
+
+        call_command('rebalance_shards', stdout=io.StringIO())
+
+        shard = shard_for_user(user.id)
+        self.assertEqual(self.count_rows('default'), (0, 0, 0))
+        self.assertEqual(self.count_rows(shard), (1, 3, 2))
+        tasks = Task.objects.using(shard).order_by('id')
+        self.assertEqual([(task.section.name, task.text) for task in tasks], [('TODO', 'New task'), ('DOING', 'Old task')])
+
+        # The cached aggregate held the board before the merge
+        data = self.client.get('/board/').json()
+        self.assertEqual([len(section['tasks']) for section in data['sections']], [1, 1, 0])
+        self.assertEqual(self.count_rows(shard_for_user(self.users[1].id)), (1, 3, 0))
+
+    def test_rebalance_dry_run(self):
+        with self.settings(BOARD_SHARDS=[]):
+            create_default_board(self.users[0])
+
+        call_command('rebalance_shards', '--dry-run', stdout=io.StringIO())
+
+        self.assertEqual(self.count_rows('default'), (1, 3, 0))
+
+    def test_deleting_user_deletes_sharded_board(self):
+        user = self.users[0]
+        with user_shard(user.id):
+            board = create_default_board(user)
+            Task.objects.create(text='Some task', section=board.section_set.first())
+
+        shard = shard_for_user(user.id)
+        user.delete()
+
+        self.assertEqual(self.count_rows(shard), (0, 0, 0))
+
+    def test_admin_browses_one_shard(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin-password')
+        self.client.force_login(admin)
+        for user in self.users:
+            with user_shard(user.id):
+                board = create_default_board(user)
+                Task.objects.create(text='Some task', section=board.section_set.first())
+
+        for user in self.users:
+            shard = shard_for_user(user.id)
+            board = Board.objects.using(shard).get()
+
+            response = self.client.get('/admin/board/section/', { 'shard': shard, })
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual({ section.board_id for section in response.context['cl'].result_list }, { board.pk })
+
+            response = self.client.get('/admin/board/task/', { 'shard': shard, })
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([task.section.board_id for task in response.context['cl'].result_list], [board.pk])
+
+            response = self.client.get('/admin/board/board/', { 'shard': shard, 'q': user.username, })
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([board.pk for board in response.context['cl'].result_list], [board.pk])
+            self.assertContains(response, '<td class="field-user_id">%d</td>' % user.id, html=True)
+
+            response = self.client.get('/admin/board/board/', { 'shard': shard, 'q': 'nobody', })
+            self.assertEqual(response.context['cl'].result_count, 0)
+
+            section = board.section_set.first()
+            response = self.client.get(
+                '/admin/board/section/%d/change/' % section.pk,
+                { '_changelist_filters': 'shard=' + shard, },
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['original'].board_id, board.pk)
+
+
+class ProvisionDefaultBoardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='alice-password')
+
+    def test_new_user_gets_job(self):
+        job = Job.objects.get(func='board.jobs.provision_default_board')
+        self.assertEqual(json.loads(job.args), [self.user.id])
+
+    def test_provision_is_idempotent(self):
+        provision_default_board(self.user.id)
+        provision_default_board(self.user.id)
+        self.assertEqual(Board.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(Section.objects.filter(board__user=self.user).count(), len(BOARD_DEFAULTS['SECTION_NAMES']))
+
+    def test_one_board_per_user(self):
+        create_default_board(self.user)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Board.objects.create(name='Another board', user=self.user)
+
+    def test_warmup_doesnt_create_board(self):
+        warm_board_cache(self.user.id)
+        self.assertFalse(Board.objects.filter(user=self.user).exists())
+        self.assertIsNone(get_cached_aggregate(self.user.id))
+
+    def test_board_get_uses_provisioned_board(self):
+        provision_default_board(self.user.id)
+        self.client.force_login(self.user)
+        data = self.client.get('/board/').json()
+        self.assertEqual(data['id'], Board.objects.get(user=self.user).id)
+
+
+class BoardCacheTests(BoardTestCase):
+    def test_login_queues_warmup(self):
+        self.assertTrue(Job.objects.filter(func='board.jobs.warm_board_cache').exists())
+
+    def test_warm_first_load(self):
+        warm_board_cache(self.user.id)
+        self.assertIsNotNone(get_cached_aggregate(self.user.id))
+
+        response = self.client.get('/board/')
+        self.assertIn('desc="hit"', response['Server-Timing'])
+
+        # Only the first fetch after login counts
+        self.client.get('/board/')
+        metrics = get_first_load_metrics()
+        self.assertEqual(metrics['warm']['count'], 1)
+        self.assertEqual(metrics['cold']['count'], 0)
+
+    def test_cold_first_load(self):
+        response = self.client.get('/board/')
+        self.assertIn('desc="miss"', response['Server-Timing'])
+        self.assertEqual(get_first_load_metrics()['cold']['count'], 1)
+
+    def test_mutation_invalidates_cache(self):
+        self.client.get('/board/')
+        self.add_task(self.sections[0], 'New task')
+
+        data = self.client.get('/board/').json()
+        self.assertEqual(data['sections'][0]['tasks'][0]['text'], 'New task')
+
+    def test_aggregate_built_before_invalidation_is_not_served(self):
+        # A fetch reads the generation, then a mutation commits and invalidates
+        # the cache before the fetch caches what it built
+        generation = get_board_generation(self.user.id)
+        invalidate_board_cache(self.user.id)
+        get_board_aggregate(self.user, generation)
+
+        self.assertIsNone(get_cached_aggregate(self.user.id))
+        self.assertIn('desc="miss"', self.client.get('/board/')['Server-Timing'])
+
+
+class BoardCacheCheckTests(SimpleTestCase):
+    @override_settings(CACHES={ 'default': { 'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', }, })
+    def test_process_local_cache_is_a_warning(self):
+        self.assertEqual([warning.id for warning in check_board_cache(None)], ['board.W001'])
+
+    @override_settings(CACHES={
+        'default': { 'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache_table', },
+    })
+    def test_shared_cache(self):
+        self.assertEqual(check_board_cache(None), [])
+
+
+class SeedBoardsTests(TestCase):
+    def test_seed_boards(self):
+        call_command('seed_boards', users=5, tasks_per_section=2, batch_size=2, stdout=io.StringIO())
+
+        self.assertEqual(User.objects.filter(username__startswith='seed-').count(), 5)
+        self.assertEqual(Board.objects.count(), 5)
+        self.assertEqual(Section.objects.count(), 5 * len(BOARD_DEFAULTS['SECTION_NAMES']))
+        self.assertEqual(Task.objects.count(), 5 * len(BOARD_DEFAULTS['SECTION_NAMES']) * 2)
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin-password')
+        self.client.force_login(admin)
+
+    def count_changelist_queries(self, url):
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def create_boards(self, count):
+        for i in range(count):
+            board = create_default_board(User.objects.create_user('user-%d' % User.objects.count()))
+            Task.objects.create(text='Some task', section=board.section_set.first())
+
+    def test_changelists_dont_load_related_objects_one_by_one(self):
+        self.create_boards(1)
+        for url in ['/admin/board/board/', '/admin/board/section/', '/admin/board/task/']:
+            queries = self.count_changelist_queries(url)
+            self.create_boards(3)
+            self.assertEqual(self.count_changelist_queries(url), queries)
+
+    def test_filters_and_search(self):
+        user = User.objects.create_user('alice')
+        create_default_board(user)
+
+        create_default_board(User.objects.create_user('bob'))
+
+        response = self.client.get('/admin/board/section/', { 'section_name': 'TODO', 'q': 'alice', })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+        response = self.client.get('/admin/board/task/', { 'section_name': 'DONE', 'q': 'nobody', })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_filters_dont_scan_table(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.client.get('/admin/board/section/')
+        self.assertFalse([query for query in queries if 'DISTINCT' in query['sql']])
@@ -0,0 +1,171 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+import functools, math, threading, time
+
+
+"""
+Token bucket rate limiting for the board API. Each (user, endpoint) pair gets
+its own bucket, which holds at most BOARD_RATE_LIMIT['CAPACITY'] tokens and is
+refilled at BOARD_RATE_LIMIT['RATE'] tokens per second. Every request consumes
+one token; requests that find the bucket empty are rejected with a 429.
+"""
+
+class LocalMemoryBackend:
+    """
+    Keeps buckets in a process-local dict. Cheap, but every gunicorn worker
+    has its own buckets, so the effective limit is multiplied by the number
+    of workers.
+
+    A bucket left alone for capacity / rate seconds is full again, which is
+    the same as having no bucket at all, so such buckets are swept out (at
+    most once per that interval) to keep memory bounded by the number of
+    recently active users.
+    """
+
+    def __init__(self, rate, capacity, **options):
+        self.rate = rate
+        self.capacity = capacity
+        self.refillTime = capacity / rate
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._lastSweep = time.time()
+
+    def consume(self, key):
+        """
+        Takes a token from the bucket identified by key.
+
+        Parameters:
+            key (str): The bucket key.
+
+        Returns:
+            A (allowed, retry_after) tuple. allowed is True if a token was
+            available; otherwise retry_after holds the number of seconds until
+            the next token becomes available.
+        """
+        with self._lock:
+            state = self._buckets.get(key)
+            allowed, retry_after, self._buckets[key] = take_token(state, self.rate, self.capacity)
+            self.sweep()
+        return allowed, retry_after
+
+    def sweep(self):
+        """
+        Drops the buckets that have refilled to capacity. Must be called with
+        the lock held.
+        """
+        now = time.time()
+        if now - self._lastSweep < self.refillTime:
+            return
+
+        self._lastSweep = now
+        self._buckets = {
+            key: state for key, state in self._buckets.items()
+            if now - state[1] < self.refillTime
+        }
+
+
+class CacheBackend:
+    """
+    Keeps buckets in one of Django's caches (BOARD_RATE_LIMIT['CACHE'], 'default'
+    if not set), so that the limit is shared between workers when the cache is
+    shared (memcached, redis, database). The read-modify-write is not atomic,
+    so a burst of truly simultaneous requests from different workers can get
+    a few extra tokens; that is fine for our purposes.
+    """
+
+    def __init__(self, rate, capacity, CACHE='default', **options):
+        self.rate = rate
+        self.capacity = capacity
+        self.cache = caches[CACHE]
+        # A bucket that hasn't been touched in this long is full again, so
+        # there is no point in keeping it around.
+        self.timeout = math.ceil(capacity / rate)
+
+    def consume(self, key):
+        """
+        Same as LocalMemoryBackend.consume.
+        """
+        cacheKey = 'board:ratelimit:' + key
+        allowed, retry_after, state = take_token(self.cache.get(cacheKey), self.rate, self.capacity)
+        self.cache.set(cacheKey, state, self.timeout)
+        return allowed, retry_after
+
+
+def take_token(state, rate, capacity):
+    """
+    Refills a bucket for the time elapsed since it was last used and tries to
+    take a token from it.
+
+    Parameters:
+        state (tuple): The (tokens, timestamp) bucket state, or None for a new bucket.
+        rate (float): Tokens added per second.
+        capacity (float): Maximum number of tokens in the bucket.
+
+    Returns:
+        A (allowed, retry_after, new_state) tuple.
+    """
+    # Wall clock rather than monotonic, since cached buckets are shared between processes
+    now = time.time()
+
+    if state is None:
+        tokens = capacity
+    else:
+        tokens, last = state
+        tokens = min(capacity, tokens + (now - last) * rate)
+
+    if tokens >= 1:
+        return True, 0, (tokens - 1, now)
+    else:
+        return False, (1 - tokens) / rate, (tokens, now)
+
+
+_backend = None
+
+def get_backend():
+    """
+    Returns the rate limit backend configured in settings.BOARD_RATE_LIMIT,
+    instantiating it the first time it is needed.
+    """
+    global _backend
+
+    if _backend is None:
+        options = dict(settings.BOARD_RATE_LIMIT)
+        backendClass = import_string(options.pop('BACKEND'))
+        _backend = backendClass(options.pop('RATE'), options.pop('CAPACITY'), **options)
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    # Makes override_settings(BOARD_RATE_LIMIT=...) work in tests
+    global _backend
+
+    if setting == 'BOARD_RATE_LIMIT':
+        _backend = None
+
+
+def rate_limited(func):
+    """
+    Returns a 429 (Too Many Requests) response if the user has exhausted their
+    token bucket for the decorated view. Must be applied after login_required
+    (i.e. below it), since buckets are keyed by user id, but before the
+    ownership decorators, so that rejected requests don't pay for their queries.
+    """
+
+    @functools.wraps(func)
+    def wrapper(request, *args, **kwargs):
+        key = '%s:%s' % (request.user.id, func.__name__)
+        allowed, retry_after = get_backend().consume(key)
+
+        if allowed:
+            return func(request, *args, **kwargs)
+        else:
+            response = HttpResponse('Too many requests, slow down a little.', status=429)
+            response['Retry-After'] = str(math.ceil(retry_after))
+            return response
+    return wrapper
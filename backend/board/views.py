@@ -1,12 +1,24 @@
+from django.conf import settings
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseNotFound, HttpResponseForbidden, JsonResponse
 from django.core import serializers
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import router, transaction
 
-import json, functools
+import json, functools, time
 
 from .models import Board, Section, Task, BOARD_DEFAULTS
+from .throttling import rate_limited
+from .coalescing import RequestCoalescer
+from .routers import pinned_to_primary, is_pinned_to_primary
+from .caching import (
+    get_board_generation, get_cached_aggregate, cache_aggregate, invalidates_board_cache, record_first_load,
+    FIRST_LOAD_SESSION_KEY,
+)
+
+
+# Shares the board aggregate between concurrent board GETs of the same user
+board_coalescer = RequestCoalescer()
 
 
 """
@@ -205,8 +217,11 @@ def create_board_aggregate(board):
 
 def create_default_board(user):
     """
-    Creates a default board with section names as defined
-    in BOARD_DEFAULTS['SECTION_NAMES'] (board/models.py).
+    Returns the board of a user, creating a default board with section names
+    as defined in BOARD_DEFAULTS['SECTION_NAMES'] (board/models.py) if the user
+    doesn't have one yet. Safe to call concurrently: the board and its sections
+    are created atomically, and Board's unique user constraint makes racing
+    callers get the board that was created first.
 
     Parameters:
         user (auth.models.User): The user for whom this board is created.
@@ -215,24 +230,62 @@ def create_default_board(user):
         A Board model object, as defined in board/models.py
     """
 
-    # Create a new board
-    board = Board(name=BOARD_DEFAULTS['NAME'], user=user)
-    board.save()
+    # Boards are created in their user's shard (see board/routers.py)
+    with transaction.atomic(using=router.db_for_write(Board, instance=user)):
+        board, created = user.board_set.get_or_create(defaults={ 'name': BOARD_DEFAULTS['NAME'], })
 
-    # Create the default sections in the board
-    for sectionName in BOARD_DEFAULTS['SECTION_NAMES']:
-        section = Section(name=sectionName, board=board)
-        section.save()
+        if created:
+            # Create the default sections in the board
+            for sectionName in BOARD_DEFAULTS['SECTION_NAMES']:
+                section = Section(name=sectionName, board=board)
+                section.save()
 
-    # Return created board
+    # Return the board
     return board
 
 
+def get_board_aggregate(user, generation):
+    """
+    Builds the board aggregate of a user's board and caches it (see
+    board/caching.py). If the user does not have a board, it creates
+    a default one. Aggregates read from a read replica aren't cached,
+    since the replica might not have caught up with the user's latest
+    changes yet.
+
+    Parameters:
+        user (auth.models.User): The user whose board aggregate is returned.
+        generation (int): The user's board cache generation, as read before
+        calling this function.
+
+    Returns:
+        A board aggregate, as created by create_board_aggregate.
+    """
+
+    board = Board.objects.filter(user=user).first()
+
+    if board is None:
+        # The board might just not have reached the replica we read from yet.
+        # create_default_board reads the primary, and so must the aggregate
+        # of the board it returns.
+        with pinned_to_primary():
+            board = create_default_board(user)
+            data = create_board_aggregate(board)
+    else:
+        data = create_board_aggregate(board)
+
+    # The whole aggregate is read from the database the board came from (see board/routers.py)
+    if board._state.db not in settings.DATABASE_READ_REPLICAS:
+        cache_aggregate(user.id, generation, data)
+    return data
+
+
 """
 Views proper. We should consider refactoring these into a class-based view, because
 they are getting a little messy.
 """
 @login_required
+@rate_limited
+@invalidates_board_cache
 @user_owns_section_and_task
 def promote_task(request, section_id, task_id):
     """
@@ -264,6 +317,8 @@ def promote_task(request, section_id, task_id):
 
 
 @login_required
+@rate_limited
+@invalidates_board_cache
 @user_owns_section_and_task
 def demote_task(request, section_id, task_id):
     """
@@ -313,16 +368,32 @@ def board(request):
         If the user does not have a board, returns a HttpResponseNotFound.
     """
 
-    try:
-        board = Board.objects.get(user=request.user)
-        return JsonResponse(create_board_aggregate(board))
-    except ObjectDoesNotExist:
-        # User has no board, create a new one and return aggregate
-        board = create_default_board(request.user)
-        return JsonResponse(create_board_aggregate(board))
+    start = time.perf_counter()
+    generation = get_board_generation(request.user.id)
+    data = get_cached_aggregate(request.user.id, generation)
+    cacheHit = data is not None
+
+    if not cacheHit:
+        # A burst of refreshes from the same user builds the aggregate only once. Requests
+        # pinned to the primary database must not get an aggregate read from a replica,
+        # and requests made after a change must not get an aggregate built before it.
+        key = (request.user.id, generation, is_pinned_to_primary())
+        data = board_coalescer.do(key, get_board_aggregate, request.user, generation)
+
+    elapsed = time.perf_counter() - start
+
+    # The flag is set on login, see board/signals.py
+    if request.session.pop(FIRST_LOAD_SESSION_KEY, False):
+        record_first_load(cacheHit, elapsed)
+
+    response = JsonResponse(data)
+    response['Server-Timing'] = 'board;desc="%s";dur=%.1f' % ('hit' if cacheHit else 'miss', elapsed * 1000)
+    return response
 
 
 @login_required
+@rate_limited
+@invalidates_board_cache
 @user_owns_section
 def add_task_to_section(request, section_id):
     """
@@ -431,6 +502,8 @@ def delete_task(request, task_id):
 
 
 @login_required
+@rate_limited
+@invalidates_board_cache
 @user_owns_section_and_task
 def task_action_router(request, section_id, task_id):
     """
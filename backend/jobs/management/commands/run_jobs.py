@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+import concurrent.futures, multiprocessing, time
+
+import django
+
+
+"""
+Worker process entry points. Workers are spawned rather than forked, so that
+they don't share the parent's database connections. They unpickle these
+functions by importing this module before Django is set up, so it must not
+import models at the top level.
+"""
+
+def init_worker():
+    django.setup()
+
+
+def execute_job(job_id):
+    from jobs.queue import run_job
+    return run_job(job_id)
+
+
+class Command(BaseCommand):
+    help = 'Runs queued jobs (see jobs/queue.py) in a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.JOBS['PROCESSES'],
+            help='Number of worker processes.',
+        )
+        parser.add_argument(
+            '--visibility-timeout', type=float, default=settings.JOBS['VISIBILITY_TIMEOUT'],
+            help='Seconds a claimed job stays hidden from other workers before it is considered lost and retried.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.JOBS['POLL_INTERVAL'],
+            help='Seconds to wait between polls when there are no jobs to run.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit as soon as there are no jobs left to run.',
+        )
+
+    def handle(self, *args, **options):
+        from jobs.queue import claim_jobs, prune_jobs
+
+        processes = options['processes']
+        running = set()
+        context = multiprocessing.get_context('spawn')
+        lastPrune = None
+
+        with concurrent.futures.ProcessPoolExecutor(processes, mp_context=context, initializer=init_worker) as pool:
+            while True:
+                # Keeps the table (and the claim queries) from growing forever
+                if lastPrune is None or time.monotonic() - lastPrune >= settings.JOBS['PRUNE_INTERVAL']:
+                    prune_jobs()
+                    lastPrune = time.monotonic()
+
+                # Only claim as many jobs as there are free processes, so that
+                # claimed jobs don't sit in the pool until their visibility times out
+                for jobId in claim_jobs(processes - len(running), options['visibility_timeout']):
+                    running.add(pool.submit(execute_job, jobId))
+
+                if running:
+                    done, running = concurrent.futures.wait(
+                        running, timeout=options['poll_interval'], return_when=concurrent.futures.FIRST_COMPLETED,
+                    )
+                    for future in done:
+                        # run_job records job errors itself, so this only raises if a worker
+                        # process died, which breaks the pool. Let the process manager restart
+                        # us; the lost jobs become visible again after the visibility timeout.
+                        future.result()
+                elif options['burst']:
+                    break
+                else:
+                    time.sleep(options['poll_interval'])
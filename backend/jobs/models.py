@@ -0,0 +1,43 @@
+from django.db import models
+from django.utils import timezone
+
+
+# Max length of the dotted path of a job function
+FUNC_MAXLENGTH = 250
+
+
+class Job(models.Model):
+    """
+    A deferred function call, see jobs/queue.py. A queued job is visible to
+    workers once available_at has passed; claiming it pushes available_at
+    forward by the visibility timeout, so that if the worker dies the job
+    becomes visible again and is retried. Once a job is done, available_at
+    holds when it finished, which is what old jobs are pruned by.
+    """
+
+    QUEUED = 'queued'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    func = models.CharField(max_length=FUNC_MAXLENGTH)
+    args = models.TextField(default='[]')   # JSON list
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField()
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Used by workers to find jobs ready to run
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return '%s(%s) [%s]' % (self.func, self.args, self.status)
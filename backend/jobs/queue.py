@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+import datetime, json, traceback
+
+from .models import Job
+
+
+"""
+A small database-backed job queue. Views enqueue calls to plain module-level
+functions with JSON-serializable arguments, and the run_jobs management command
+runs them in a pool of worker processes:
+
+    from jobs.queue import enqueue
+    enqueue(provision_default_board, user.id)
+
+Jobs are run at least once: a job whose worker dies (or takes longer than the
+visibility timeout) is run again, so job functions must be idempotent.
+"""
+
+def enqueue(func, *args, delay=0, max_attempts=None):
+    """
+    Queues a call to func(*args).
+
+    Parameters:
+        func (callable): A module-level function.
+        args: JSON-serializable arguments for func.
+        delay (float): Seconds to wait before the job can run.
+        max_attempts (int): Times the job is tried before giving up. Defaults
+        to settings.JOBS['MAX_ATTEMPTS'].
+
+    Returns:
+        The created jobs.models.Job.
+    """
+    if max_attempts is None:
+        max_attempts = settings.JOBS['MAX_ATTEMPTS']
+
+    return Job.objects.create(
+        func='%s.%s' % (func.__module__, func.__qualname__),
+        args=json.dumps(args),
+        max_attempts=max_attempts,
+        available_at=timezone.now() + datetime.timedelta(seconds=delay),
+    )
+
+
+def claim_jobs(limit, visibility_timeout=None):
+    """
+    Claims up to limit jobs that are ready to run, hiding them from other
+    workers for visibility_timeout seconds. Claims are made with a conditional
+    update, so two workers can never claim the same job.
+
+    Parameters:
+        limit (int): Maximum number of jobs to claim.
+        visibility_timeout (float): Defaults to settings.JOBS['VISIBILITY_TIMEOUT'].
+
+    Returns:
+        A list with the ids of the claimed jobs.
+    """
+    if visibility_timeout is None:
+        visibility_timeout = settings.JOBS['VISIBILITY_TIMEOUT']
+
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.QUEUED, available_at__lte=now).order_by('available_at')
+    claimed = []
+
+    for job in candidates.values('id', 'available_at', 'attempts')[:limit]:
+        updated = Job.objects.filter(pk=job['id'], status=Job.QUEUED, available_at=job['available_at']).update(
+            available_at=now + datetime.timedelta(seconds=visibility_timeout),
+            attempts=job['attempts'] + 1,
+        )
+        if updated:
+            claimed.append(job['id'])
+
+    return claimed
+
+
+def run_job(job_id):
+    """
+    Runs a claimed job and records its outcome. Failed jobs are retried with
+    exponential backoff (settings.JOBS['RETRY_DELAY'] seconds, doubled on every
+    attempt) until they run out of attempts.
+
+    The outcome is only recorded if the job hasn't been claimed again since
+    (i.e. this run outlived the visibility timeout), so that it doesn't clobber
+    the state of the newer attempt, which records its own outcome.
+
+    Parameters:
+        job_id (int): The id of a job returned by claim_jobs.
+
+    Returns:
+        True if the job succeeded; False otherwise.
+    """
+    job = Job.objects.get(pk=job_id)
+    claim = Job.objects.filter(pk=job.pk, status=Job.QUEUED, attempts=job.attempts)
+
+    try:
+        func = import_string(job.func)
+        func(*json.loads(job.args))
+    except Exception:
+        if job.attempts >= job.max_attempts:
+            claim.update(status=Job.FAILED, last_error=traceback.format_exc())
+        else:
+            delay = settings.JOBS['RETRY_DELAY'] * 2 ** (job.attempts - 1)
+            claim.update(
+                available_at=timezone.now() + datetime.timedelta(seconds=delay),
+                last_error=traceback.format_exc(),
+            )
+        return False
+
+    # For finished jobs, available_at holds when they finished (see prune_jobs)
+    claim.update(status=Job.DONE, available_at=timezone.now())
+    return True
+
+
+def prune_jobs(retention=None):
+    """
+    Deletes the jobs that finished successfully more than retention seconds
+    ago. Failed jobs are kept, so that their errors can be looked into.
+
+    Parameters:
+        retention (float): Defaults to settings.JOBS['DONE_RETENTION'].
+
+    Returns:
+        The number of deleted jobs.
+    """
+    if retention is None:
+        retention = settings.JOBS['DONE_RETENTION']
+
+    cutoff = timezone.now() - datetime.timedelta(seconds=retention)
+    deleted, _ = Job.objects.filter(status=Job.DONE, available_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,90 @@
+from django.test import TestCase
+from django.utils import timezone
+
+import datetime
+
+from .models import Job
+from .queue import enqueue, claim_jobs, run_job, prune_jobs
+
+
+# Calls made by record(), shared with the tests
+recorded = []
+
+def record(*args):
+    recorded.append(args)
+
+
+def explode():
+    raise ValueError('Boom')
+
+
+def outlive_visibility_timeout():
+    # Another worker claims the job again while this run is still going
+    Job.objects.update(available_at=timezone.now())
+    claim_jobs(10, visibility_timeout=300)
+    raise ValueError('Boom')
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        recorded.clear()
+        Job.objects.all().delete()
+
+    def test_enqueue_and_run(self):
+        enqueue(record, 1, 'two')
+        jobIds = claim_jobs(10)
+
+        self.assertEqual(len(jobIds), 1)
+        self.assertTrue(run_job(jobIds[0]))
+        self.assertEqual(recorded, [(1, 'two')])
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    def test_delayed_job_is_not_claimed(self):
+        enqueue(record, delay=60)
+        self.assertEqual(claim_jobs(10), [])
+
+    def test_claimed_job_is_hidden_until_visibility_timeout(self):
+        job = enqueue(record)
+        self.assertEqual(claim_jobs(10, visibility_timeout=60), [job.id])
+        self.assertEqual(claim_jobs(10), [])
+
+        # The worker died: once the visibility timeout passes, the job can be claimed again
+        Job.objects.filter(pk=job.id).update(available_at=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(claim_jobs(10), [job.id])
+        self.assertEqual(Job.objects.get().attempts, 2)
+
+    def test_failed_job_is_retried(self):
+        job = enqueue(explode, max_attempts=2)
+
+        self.assertFalse(run_job(claim_jobs(10)[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.available_at, timezone.now())
+        self.assertIn('Boom', job.last_error)
+
+        Job.objects.filter(pk=job.id).update(available_at=timezone.now())
+        self.assertFalse(run_job(claim_jobs(10)[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_stale_run_doesnt_clobber_newer_attempt(self):
+        job = enqueue(outlive_visibility_timeout)
+
+        self.assertFalse(run_job(claim_jobs(10)[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.last_error, '')
+        # Still hidden by the second claim, rather than waiting for the retry delay
+        self.assertGreater(job.available_at, timezone.now() + datetime.timedelta(seconds=60))
+
+    def test_prune_jobs(self):
+        done = enqueue(record)
+        run_job(claim_jobs(10)[0])
+        failed = enqueue(explode, max_attempts=1)
+        run_job(claim_jobs(10)[0])
+        queued = enqueue(record)
+
+        self.assertEqual(prune_jobs(retention=60), 0)
+        Job.objects.update(available_at=timezone.now() - datetime.timedelta(seconds=120))
+        self.assertEqual(prune_jobs(retention=60), 1)
+        self.assertEqual(set(Job.objects.values_list('id', flat=True)), { failed.id, queued.id, })
@@ -14,6 +14,9 @@ def main():
             "available on your PYTHONPATH environment variable? Did you "
             "forget to activate a virtual environment?"
         ) from exc
+    if os.getenv('PROFILE_STARTUP'):
+        from backend.startup import profile_setup
+        profile_setup()
     execute_from_command_line(sys.argv)
 
 